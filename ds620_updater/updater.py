@@ -6,12 +6,19 @@ Based on reverse engineering of DNP DS620A firmware update protocol
 
 import sys
 import os
+import errno
+import glob
 import time
 import argparse
 import logging
 import subprocess
 import signal
 import atexit
+import select
+import array
+import mmap
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
@@ -22,35 +29,126 @@ except ImportError:
     print("Error: pyusb not installed. Please run: pip install pyusb")
     sys.exit(1)
 
+# Optional: query CUPS and systemd directly instead of running lpstat/systemctl
+try:
+    import cups
+except ImportError:
+    cups = None
+
+try:
+    import dbus
+except ImportError:
+    dbus = None
+
 # USB Device IDs for DS620A
 DNP_VENDOR_IDS = [0x1343, 0x1452]  # DNP and alternate vendor ID
+ALT_VENDOR_ID = 0x1452
 PRODUCT_IDS = {
-    0x1343: [0x0001, 0x0002, 0x0003, 0x0004, 0x0005, 0x0006, 0x0007, 0x0008, 0x0009, 0x1001, 0xFFFF],
-    0x1452: [0x8b01, 0x8b02, 0x9001, 0x9201, 0x9301, 0x9401]
+    0x1343: frozenset({0x0001, 0x0002, 0x0003, 0x0004, 0x0005, 0x0006, 0x0007, 0x0008, 0x0009, 0x1001, 0xFFFF}),
+    0x1452: frozenset({0x8b01, 0x8b02, 0x9001, 0x9201, 0x9301, 0x9401})
 }
+SUPPORTED_DEVICES = frozenset(
+    (vid, pid) for vid, pids in PRODUCT_IDS.items() for pid in pids
+)
 
 # Protocol constants
 ESC = 0x1B  # Control character
 CR = 0x0D   # Carriage return
 LF = 0x0A   # Line feed
 CRLF = bytes([CR, LF])
+CMD_LENGTH = 24  # ESC + command text + space padding
+
+# systemd D-Bus objects for cups.service
+SYSTEMD_BUS_NAME = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+CUPS_UNIT_PATH = "/org/freedesktop/systemd1/unit/cups_2eservice"
+SYSTEMD_NO_SUCH_UNIT = "org.freedesktop.systemd1.NoSuchUnit"
+UNIT_STOP_TIMEOUT = 30.0  # Upper bound on waiting for a stopped unit to go inactive
+
+# sysfs locations used to detach the usblp kernel driver
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices/"
+USBLP_UNBIND_PATH = "/sys/bus/usb/drivers/usblp/unbind"
 
 # Timing constants (milliseconds)
 WAIT_1000MS = 1.0
 WAIT_2000MS = 2.0
-WAIT_CHMODE = 0.5
-WAIT_UPDATE = 3.0
 PRG_UPDATE_WAIT = 5.0
+POLL_INTERVAL_MIN = 0.5  # Status polling backoff bounds
+POLL_INTERVAL_MAX = 5.0
+CONFIRM_TIMEOUT = 60.0  # Seconds to wait for the user to confirm the update
+USB_RELEASE_TIMEOUT = 2.0  # Upper bound on waiting for a busy device to be released
+SOFT_RESET_SETTLE = 0.5  # Minimum wait after a printer class SOFT_RESET
+RESTART_TIMEOUT = 5.0  # How long to watch for the printer re-enumerating after reset
+REAPPEAR_TIMEOUT = 30.0  # Upper bound on waiting for the printer to be on the bus again
+VERIFY_READ_TIMEOUT = 15000  # milliseconds; version query after the printer is back
+
+# Spellings of the target firmware version in printer responses and S-Records
+FIRMWARE_VERSION_TOKENS = (b"04.52", b"0452")
+
+# CWD configuration files, in the order of the table IDs the printer uses
+CWD_FILES = (
+    "DS620_PD_300_0111.cwd",
+    "DS620_PD_600_0111.cwd",
+    "DS620_PD_610_0111.cwd",
+    "DS620_SD_300_0111.cwd",
+    "DS620_SD_600_0111.cwd",
+    "DS620_SD_610_0111.cwd",
+)
+
+CWD_HEADER_MAGIC = b"DNP    "  # Every CWD file starts with this
+
+# CWD version/checksum queries, keyed by the table ID the printer uses
+CWD_QUERIES = tuple(
+    (cwd_file,
+     b"PTBL_RDCWD%03d_Version" % cwd_id,
+     b"PTBL_RDCWD%03d_Checksum" % cwd_id)
+    for cwd_id, cwd_file in enumerate(CWD_FILES, 1)
+)
+
+# Bulk transfer sizing for firmware upload; libusb splits each write
+# into URBs itself, so a write can be much larger than wMaxPacketSize
+FIRMWARE_CHUNK_SIZE = 1024 * 1024
+READ_SIZE = 1024  # Bytes requested per response read
+SREC_SCAN_BLOCK = 64 * 1024  # Dry-run scan block; holds 100 S-Records of max length
+BULK_WRITE_TIMEOUT_MIN = 5000  # milliseconds; floor for any bulk payload write
+MIN_BYTES_PER_MS = 32  # Slowest accepted transfer rate (~32 KB/s); sets larger writes' timeouts
+CWD_UPDATE_TIMEOUT = 18000  # milliseconds; the read returns as soon as the printer acks
+
+CONSOLE_HANDLER_NAME = "ds620-console"  # Marks the console handler setup_logging installs
+
+@functools.lru_cache(maxsize=64)
+def pack_command(command):
+    """Return the 24-byte frame for a command: ESC, the ASCII text, space padding"""
+    encoded = command if isinstance(command, bytes) else command.encode('ascii')
+    return bytes([ESC]) + encoded.ljust(CMD_LENGTH - 1, b' ')
+
+def pack_length(size):
+    """Return the 8-digit ASCII length that precedes firmware and CWD payloads"""
+    return b"%08d" % size
 
 class DS620Updater:
-    def __init__(self, firmware_path, cwd_dir, log_file=None):
-        self.firmware_path = Path(firmware_path)
-        self.cwd_dir = Path(cwd_dir)
+    def __init__(self, firmware_path, cwd_dir, log_file=None, chunk_size=FIRMWARE_CHUNK_SIZE,
+                 skip_current_cwd=False):
+        self.firmware_path = Path(firmware_path) if firmware_path is not None else None
+        self.cwd_dir = Path(cwd_dir) if cwd_dir is not None else None
+        self.cwd_paths = [self.cwd_dir / cwd_file for cwd_file in CWD_FILES] if self.cwd_dir else []
+        self.chunk_size = chunk_size
+        self.skip_current_cwd = skip_current_cwd  # Don't rewrite CWDs the printer already has
         self.device = None
+        self.vendor_id = None
+        self.product_id = None
+        self.alt_vendor = False  # Vendor 0x1452 quirks, resolved in find_printer
         self.ep_out = None
         self.ep_in = None
+        self.sysfs_name = None
+        self.rx_pending = b''  # Replies left over from one read, within a query_commands batch
+        self.in_batch = False
+        self.tx_buffer = array.array('B')  # Reused for every bulk payload write
+        self.rx_buffer = array.array('B', bytes(READ_SIZE))  # Reused for every response read
         self.cups_was_running = False
+        self.system_bus = None  # D-Bus system bus connection, opened on first use
         self.update_in_progress = False
+        self.interrupt_time = None  # When the last Ctrl+C during an update arrived
         self.start_time = datetime.now()
         
         # Setup logging
@@ -64,12 +162,19 @@ class DS620Updater:
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG if log_file else logging.INFO)
         
-        # Console handler
-        console_handler = logging.StreamHandler()
+        # Resolved once so hot paths test a plain attribute
+        self.debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+        
+        # Console handler; the logger is shared by every instance, so it is
+        # only added once and later instances just update its level
+        console_handler = next((h for h in self.logger.handlers if h.get_name() == CONSOLE_HANDLER_NAME), None)
+        if console_handler is None:
+            console_handler = logging.StreamHandler()
+            console_handler.set_name(CONSOLE_HANDLER_NAME)
+            console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+            console_handler.setFormatter(console_formatter)
+            self.logger.addHandler(console_handler)
         console_handler.setLevel(logging.getLogger().level)
-        console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
         
         # File handler if requested
         if log_file:
@@ -78,7 +183,7 @@ class DS620Updater:
             file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(funcName)s - %(message)s')
             file_handler.setFormatter(file_formatter)
             self.logger.addHandler(file_handler)
-            self.logger.info(f"Logging to file: {log_file}")
+            self.logger.info("Logging to file: %s", log_file)
             
     def setup_signal_handlers(self):
         """Setup signal handlers for clean shutdown"""
@@ -90,13 +195,16 @@ class DS620Updater:
         """Handle Ctrl+C and termination signals"""
         self.logger.warning("\n\nReceived interrupt signal!")
         if self.update_in_progress:
+            # A second Ctrl+C within 5 seconds of the first forces the quit
+            now = time.monotonic()
+            if self.interrupt_time is not None and now - self.interrupt_time < 5:
+                self.force_quit(signum, frame)
+                
             self.logger.error("WARNING: Update in progress! Interrupting now may damage the printer!")
             self.logger.error("Press Ctrl+C again within 5 seconds to force quit...")
             
-            # Give user a chance to reconsider
-            signal.signal(signal.SIGINT, self.force_quit)
-            time.sleep(5)
-            signal.signal(signal.SIGINT, self.signal_handler)
+            # Give user a chance to reconsider; the update keeps running meanwhile
+            self.interrupt_time = now
         else:
             self.cleanup()
             sys.exit(1)
@@ -123,13 +231,97 @@ class DS620Updater:
         if self.cups_was_running:
             self.logger.info("Restarting CUPS service...")
             try:
-                subprocess.run(['sudo', 'systemctl', 'start', 'cups'], 
-                             capture_output=True, check=True)
+                self.control_unit('start', 'cups')
                 self.logger.info("CUPS service restarted")
             except Exception as e:
-                self.logger.error(f"Failed to restart CUPS: {e}")
+                self.logger.error("Failed to restart CUPS: %s", e)
                 self.logger.error("Please run: sudo systemctl start cups")
         
+    def get_system_bus(self):
+        """Return the D-Bus system bus connection, reused for every systemd call"""
+        if self.system_bus is None:
+            self.system_bus = dbus.SystemBus()
+        return self.system_bus
+        
+    def control_unit(self, action, unit, check=True):
+        """Start or stop a systemd unit, over D-Bus when available
+        
+        With check=False failures are ignored, e.g. for optional units.
+        """
+        if dbus is not None:
+            try:
+                systemd = self.get_system_bus().get_object(SYSTEMD_BUS_NAME, SYSTEMD_PATH)
+                manager = dbus.Interface(systemd, 'org.freedesktop.systemd1.Manager')
+                if action == 'start':
+                    manager.StartUnit(unit + '.service', 'replace')
+                else:
+                    # StopUnit only queues the stop job; wait for it like
+                    # systemctl stop does
+                    manager.StopUnit(unit + '.service', 'replace')
+                    self.wait_unit_stopped(manager, unit + '.service')
+                return
+            except dbus.DBusException as e:
+                if not check and e.get_dbus_name() == SYSTEMD_NO_SUCH_UNIT:
+                    return
+                self.logger.debug("systemd D-Bus %s failed, using systemctl: %s", action, e)
+                
+        subprocess.run(['sudo', 'systemctl', action, unit], 
+                     capture_output=True, check=check)
+        
+    def wait_unit_stopped(self, manager, unit_name):
+        """Poll a systemd unit's ActiveState until it has stopped, for up to
+        UNIT_STOP_TIMEOUT"""
+        try:
+            unit = self.get_system_bus().get_object(SYSTEMD_BUS_NAME, manager.GetUnit(unit_name))
+        except dbus.DBusException as e:
+            if e.get_dbus_name() == SYSTEMD_NO_SUCH_UNIT:
+                return  # Already stopped and unloaded
+            raise
+        
+        deadline = time.monotonic() + UNIT_STOP_TIMEOUT
+        while True:
+            state = unit.Get('org.freedesktop.systemd1.Unit', 'ActiveState',
+                             dbus_interface='org.freedesktop.DBus.Properties')
+            if state in ('inactive', 'failed'):
+                return
+            if time.monotonic() >= deadline:
+                self.logger.warning("%s still %s after %.0f seconds", unit_name, state, UNIT_STOP_TIMEOUT)
+                return
+            time.sleep(0.1)
+            
+    def cups_service_active(self):
+        """Check whether cups.service is active, over D-Bus when available"""
+        if dbus is not None:
+            try:
+                unit = self.get_system_bus().get_object(SYSTEMD_BUS_NAME, CUPS_UNIT_PATH)
+                state = unit.Get('org.freedesktop.systemd1.Unit', 'ActiveState',
+                                 dbus_interface='org.freedesktop.DBus.Properties')
+                return state == 'active'
+            except dbus.DBusException as e:
+                self.logger.debug("systemd D-Bus query failed, using systemctl: %s", e)
+                
+        result = subprocess.run(['systemctl', 'is-active', 'cups'], 
+                              capture_output=True, text=True)
+        return result.stdout.strip() == 'active'
+        
+    def cups_printer_devices(self):
+        """Return (name, device URI) for every CUPS queue, via pycups when available"""
+        if cups is not None:
+            try:
+                printers = cups.Connection().getPrinters()
+                return [(name, attrs.get('device-uri', '')) for name, attrs in printers.items()]
+            except (RuntimeError, cups.IPPError) as e:
+                self.logger.debug("pycups query failed, using lpstat: %s", e)
+                
+        result = subprocess.run(['lpstat', '-v'], 
+                              capture_output=True, text=True)
+        devices = []
+        for line in result.stdout.splitlines():
+            if line.startswith('device for '):
+                name, _, uri = line[len('device for '):].partition(': ')
+                devices.append((name, uri))
+        return devices
+        
     def check_cups_status(self):
         """Check if CUPS is running and has claimed the printer"""
         cups_running = False
@@ -138,24 +330,18 @@ class DS620Updater:
         
         try:
             # Check if CUPS is running
-            result = subprocess.run(['systemctl', 'is-active', 'cups'], 
-                                  capture_output=True, text=True)
-            cups_running = result.stdout.strip() == 'active'
+            cups_running = self.cups_service_active()
             
             if cups_running:
                 # Check if DS620 is configured in CUPS
-                result = subprocess.run(['lpstat', '-v'], 
-                                      capture_output=True, text=True)
-                for line in result.stdout.split('\n'):
-                    if 'dnp-ds620' in line.lower() or 'ds620' in line.lower():
+                for name, uri in self.cups_printer_devices():
+                    if 'ds620' in name.lower() or 'ds620' in uri.lower():
                         printer_in_cups = True
-                        # Extract printer name
-                        if line.startswith('device for '):
-                            cups_printer_name = line.split(':')[0].replace('device for ', '')
-                        self.logger.warning(f"DS620 is configured in CUPS: {line}")
+                        cups_printer_name = name
+                        self.logger.warning("DS620 is configured in CUPS: %s (%s)", name, uri)
                         
         except Exception as e:
-            self.logger.debug(f"Could not check CUPS status: {e}")
+            self.logger.debug("Could not check CUPS status: %s", e)
             
         return cups_running, printer_in_cups, cups_printer_name
     
@@ -171,7 +357,7 @@ class DS620Updater:
             self.logger.warning("")
             self.logger.warning("Options to fix this:")
             self.logger.warning("1. Temporarily stop CUPS: sudo systemctl stop cups")
-            self.logger.warning(f"2. Remove printer from CUPS: sudo lpadmin -x {cups_printer_name}")
+            self.logger.warning("2. Remove printer from CUPS: sudo lpadmin -x %s", cups_printer_name)
             self.logger.warning("3. Run this updater with sudo")
             self.logger.warning("")
             self.logger.warning("After update, restart CUPS: sudo systemctl start cups")
@@ -182,14 +368,17 @@ class DS620Updater:
                 self.logger.error("Not running as root. CUPS may block USB access.")
                 self.logger.error("Try running with sudo.")
         
-        for vid in DNP_VENDOR_IDS:
-            for pid in PRODUCT_IDS.get(vid, []):
-                self.device = usb.core.find(idVendor=vid, idProduct=pid)
-                if self.device:
-                    self.logger.info(f"Found DS620A printer: VID={hex(vid)}, PID={hex(pid)}")
-                    self.vendor_id = vid
-                    self.product_id = pid
-                    return True
+        # Single bus enumeration, matching every known VID:PID at once
+        self.device = usb.core.find(
+            custom_match=lambda d: (d.idVendor, d.idProduct) in SUPPORTED_DEVICES
+        )
+        if self.device:
+            vid, pid = self.device.idVendor, self.device.idProduct
+            self.logger.info("Found DS620A printer: VID=%#x, PID=%#x", vid, pid)
+            self.vendor_id = vid
+            self.product_id = pid
+            self.alt_vendor = vid == ALT_VENDOR_ID
+            return True
         
         self.logger.error("DS620A printer not found. Please ensure it's connected via USB.")
         self.logger.error("Looking for VID:PID combinations: 1343:xxxx and 1452:xxxx")
@@ -201,87 +390,83 @@ class DS620Updater:
             
         return False
         
+    def find_sysfs_name(self):
+        """Find the sysfs name (busnum-port[.port...]) of the printer device"""
+        if self.sysfs_name:
+            return self.sysfs_name
+            
+        bus = self.device.bus
+        
+        # pyusb exposes the port chain directly, so the name can be built
+        # without touching sysfs
+        ports = self.device.port_numbers
+        if ports:
+            self.sysfs_name = f"{bus}-" + ".".join(str(p) for p in ports)
+            return self.sysfs_name
+            
+        # Fall back to scanning the bus for a matching devnum
+        address = self.device.address
+        for device_path in glob.glob(f"{SYSFS_USB_DEVICES}{bus}-*"):
+            try:
+                fd = os.open(os.path.join(device_path, "devnum"), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                devnum = int(os.pread(fd, 16, 0))
+            except (OSError, ValueError) as e:
+                self.logger.debug("Error checking %s: %s", device_path, e)
+                continue
+            finally:
+                os.close(fd)
+                
+            if devnum == address:
+                self.sysfs_name = os.path.basename(device_path)
+                return self.sysfs_name
+                
+        return None
+        
     def unbind_usblp(self):
         """Unbind usblp driver from printer device"""
         try:
-            # Get device bus and address
-            bus = self.device.bus
-            address = self.device.address
-            
-            self.logger.info(f"Attempting to unbind usblp driver from bus {bus}, device {address}")
-            
-            # Method 1: Try direct unbind using lsusb output format
-            # The interface is typically bus-port:config.interface (e.g., "1-4:1.0")
-            import subprocess
+            self.logger.info("Attempting to unbind usblp driver from bus %s, device %s",
+                             self.device.bus, self.device.address)
             
-            # Get the device path from lsusb
-            result = subprocess.run(
-                ["lsusb", "-t"],
-                capture_output=True,
-                text=True
-            )
-            
-            if self.logger.level == logging.DEBUG:
-                self.logger.debug(f"lsusb -t output:\n{result.stdout}")
-            
-            # Method 2: Find the correct sysfs path
             # USB devices in sysfs follow pattern: /sys/bus/usb/devices/busnum-port[.port...]
-            sysfs_base = "/sys/bus/usb/devices/"
+            sysfs_name = self.find_sysfs_name()
+            if not sysfs_name:
+                self.logger.warning("Could not find device in sysfs - attempting to continue anyway")
+                return True  # Try to continue even if unbind failed
+                
+            self.logger.info("Found device at %s%s", SYSFS_USB_DEVICES, sysfs_name)
+            
+            # The interface is typically :1.0 for first interface
+            interface_name = sysfs_name + ":1.0"
+            self.logger.info("Unbinding usblp from interface %s", interface_name)
             
-            # Try to find files that match our bus
+            # Opening the unbind file doubles as the check that usblp is loaded
             try:
-                import glob
-                # Look for all devices on this bus
-                for device_path in glob.glob(f"{sysfs_base}{bus}-*"):
-                    if not os.path.isdir(device_path):
-                        continue
-                        
-                    # Check if this is our device by reading devnum
-                    try:
-                        devnum_path = os.path.join(device_path, "devnum")
-                        if os.path.exists(devnum_path):
-                            with open(devnum_path, 'r') as f:
-                                devnum = int(f.read().strip())
-                                
-                            if devnum == address:
-                                # Found our device! Now try to unbind usblp
-                                self.logger.info(f"Found device at {device_path}")
-                                
-                                # The interface is typically :1.0 for first interface
-                                interface_name = os.path.basename(device_path) + ":1.0"
-                                unbind_path = "/sys/bus/usb/drivers/usblp/unbind"
-                                
-                                if os.path.exists(unbind_path):
-                                    self.logger.info(f"Unbinding usblp from interface {interface_name}")
-                                    try:
-                                        with open(unbind_path, 'w') as f:
-                                            f.write(interface_name + "\n")
-                                        self.logger.info("Successfully unbound usblp driver")
-                                        time.sleep(0.5)  # Give system time to release
-                                        return True
-                                    except IOError as e:
-                                        if "No such device" in str(e):
-                                            self.logger.info("Device not bound to usblp (already unbound?)")
-                                            return True
-                                        else:
-                                            self.logger.warning(f"Failed to write to unbind: {e}")
-                                else:
-                                    self.logger.warning("usblp unbind path not found - driver might not be loaded")
-                                    return True  # Not an error if usblp isn't loaded
-                                    
-                    except Exception as e:
-                        self.logger.debug(f"Error checking {device_path}: {e}")
-                        continue
-                        
-            except Exception as e:
-                self.logger.warning(f"Error searching sysfs: {e}")
+                fd = os.open(USBLP_UNBIND_PATH, os.O_WRONLY)
+            except FileNotFoundError:
+                self.logger.warning("usblp unbind path not found - driver might not be loaded")
+                return True  # Not an error if usblp isn't loaded
                 
-            # If we get here, we couldn't find the device
-            self.logger.warning("Could not find device in sysfs - attempting to continue anyway")
-            return True  # Try to continue even if unbind failed
+            try:
+                os.write(fd, (interface_name + "\n").encode('ascii'))
+            except OSError as e:
+                if e.errno == errno.ENODEV:
+                    self.logger.info("Device not bound to usblp (already unbound?)")
+                    return True
+                self.logger.warning("Failed to write to unbind: %s", e)
+                return True  # Try to continue even if unbind failed
+            finally:
+                os.close(fd)
+                
+            self.logger.info("Successfully unbound usblp driver")
+            time.sleep(0.5)  # Give system time to release
+            return True
             
         except Exception as e:
-            self.logger.warning(f"Failed to unbind usblp: {e}")
+            self.logger.warning("Failed to unbind usblp: %s", e)
             return True  # Try to continue even if unbind failed
     
     def setup_usb(self):
@@ -294,8 +479,9 @@ class DS620Updater:
             if self.device.is_kernel_driver_active(0):
                 self.device.detach_kernel_driver(0)
                 
-            # Set configuration
-            self.device.set_configuration()
+            # Set configuration; a CUPS backend that is still exiting may
+            # hold the device for a moment, so retry while it is busy
+            self.retry_while_busy(self.device.set_configuration)
             
             # Get configuration
             cfg = self.device.get_active_configuration()
@@ -315,19 +501,23 @@ class DS620Updater:
             if not self.ep_out or not self.ep_in:
                 raise Exception("Could not find USB endpoints")
                 
+            # Claim the interface once for the whole session; it is only
+            # released by dispose_resources when the run is over
+            self.retry_while_busy(usb.util.claim_interface, self.device, intf)
+            
             self.logger.info("USB communication established")
             
-            if self.logger.level == logging.DEBUG:
-                self.logger.debug(f"OUT endpoint: 0x{self.ep_out.bEndpointAddress:02x}")
-                self.logger.debug(f"IN endpoint: 0x{self.ep_in.bEndpointAddress:02x}")
-                self.logger.debug(f"Device: {self.device}")
-                self.logger.debug(f"Configuration: {cfg}")
+            if self.debug_enabled:
+                self.logger.debug("OUT endpoint: 0x%02x", self.ep_out.bEndpointAddress)
+                self.logger.debug("IN endpoint: 0x%02x", self.ep_in.bEndpointAddress)
+                self.logger.debug("Device: %s", self.device)
+                self.logger.debug("Configuration: %s", cfg)
             
             # Clear any pending data
             self.clear_usb_buffers()
             
             # Run diagnostics if in debug mode
-            if self.logger.level == logging.DEBUG:
+            if self.debug_enabled:
                 self.diagnose_usb()
             
             # Initialize printer communication
@@ -336,19 +526,48 @@ class DS620Updater:
             return True
             
         except Exception as e:
-            self.logger.error(f"USB setup failed: {e}")
+            self.logger.error("USB setup failed: %s", e)
             return False
             
+    def retry_while_busy(self, operation, *args):
+        """Run a USB operation, retrying for up to USB_RELEASE_TIMEOUT while
+        the device is busy"""
+        deadline = time.monotonic() + USB_RELEASE_TIMEOUT
+        while True:
+            try:
+                return operation(*args)
+            except usb.core.USBError as e:
+                if e.errno != errno.EBUSY or time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+                
     def clear_usb_buffers(self):
         """Clear any pending data from USB buffers"""
-        if self.logger.level == logging.DEBUG:
+        if self.debug_enabled:
             self.logger.debug("Clearing USB buffers...")
         
+        # Reset the IN endpoint's halt state so a stale stall can't block reads
+        try:
+            self.ep_in.clear_halt()
+        except usb.core.USBError as e:
+            self.logger.debug("Could not clear IN endpoint halt: %s", e)
+            
+        self.drain_input()
+        
+    def drain_input(self):
+        """Discard any replies already waiting on the IN endpoint, so the
+        next read gets the answer to the next command"""
+        self.rx_pending = b''
+        
+        # Drain anything already queued; an empty pipe is detected after 1 ms,
+        # and only once data turns up do the reads wait a little longer
+        timeout = 1
         try:
             while True:
-                data = self.ep_in.read(1024, timeout=100)
-                if self.logger.level == logging.DEBUG:
-                    self.logger.debug(f"Cleared {len(data)} bytes from input buffer")
+                count = self.ep_in.read(self.rx_buffer, timeout=timeout)
+                if self.debug_enabled:
+                    self.logger.debug("Cleared %d bytes from input buffer", count)
+                timeout = 10
         except usb.core.USBTimeoutError:
             # No more data to read
             pass
@@ -357,44 +576,45 @@ class DS620Updater:
         """Print detailed USB device information for debugging"""
         self.logger.debug("=== USB Device Diagnostics ===")
         try:
-            self.logger.debug(f"Vendor: 0x{self.device.idVendor:04x}")
-            self.logger.debug(f"Product: 0x{self.device.idProduct:04x}")
+            self.logger.debug("Vendor: 0x%04x", self.device.idVendor)
+            self.logger.debug("Product: 0x%04x", self.device.idProduct)
             
             # Try to get device strings
             try:
                 manufacturer = usb.util.get_string(self.device, self.device.iManufacturer)
-                self.logger.debug(f"Manufacturer: {manufacturer}")
+                self.logger.debug("Manufacturer: %s", manufacturer)
             except:
                 self.logger.debug("Manufacturer: (unable to read)")
                 
             try:
                 product = usb.util.get_string(self.device, self.device.iProduct)
-                self.logger.debug(f"Product Name: {product}")
+                self.logger.debug("Product Name: %s", product)
             except:
                 self.logger.debug("Product Name: (unable to read)")
                 
             try:
                 serial = usb.util.get_string(self.device, self.device.iSerialNumber)
-                self.logger.debug(f"Serial: {serial}")
+                self.logger.debug("Serial: %s", serial)
             except:
                 self.logger.debug("Serial: (unable to read)")
             
             # List all configurations and interfaces
             for cfg in self.device:
-                self.logger.debug(f"\nConfiguration {cfg.bConfigurationValue}:")
+                self.logger.debug("\nConfiguration %s:", cfg.bConfigurationValue)
                 for intf in cfg:
-                    self.logger.debug(f"  Interface {intf.bInterfaceNumber}, Alt {intf.bAlternateSetting}:")
-                    self.logger.debug(f"    Class: 0x{intf.bInterfaceClass:02x} (0x07=Printer)")
-                    self.logger.debug(f"    Subclass: 0x{intf.bInterfaceSubClass:02x}")
-                    self.logger.debug(f"    Protocol: 0x{intf.bInterfaceProtocol:02x}")
+                    self.logger.debug("  Interface %s, Alt %s:", intf.bInterfaceNumber, intf.bAlternateSetting)
+                    self.logger.debug("    Class: 0x%02x (0x07=Printer)", intf.bInterfaceClass)
+                    self.logger.debug("    Subclass: 0x%02x", intf.bInterfaceSubClass)
+                    self.logger.debug("    Protocol: 0x%02x", intf.bInterfaceProtocol)
                     
                     for ep in intf:
                         direction = "IN" if ep.bEndpointAddress & 0x80 else "OUT"
                         ep_type = ["Control", "Isochronous", "Bulk", "Interrupt"][ep.bmAttributes & 0x03]
-                        self.logger.debug(f"    Endpoint 0x{ep.bEndpointAddress:02x}: {direction} {ep_type}, MaxPacket={ep.wMaxPacketSize}")
+                        self.logger.debug("    Endpoint 0x%02x: %s %s, MaxPacket=%d",
+                                          ep.bEndpointAddress, direction, ep_type, ep.wMaxPacketSize)
                         
         except Exception as e:
-            self.logger.debug(f"Error during USB diagnostics: {e}")
+            self.logger.debug("Error during USB diagnostics: %s", e)
             
     def test_raw_usb(self):
         """Test raw USB communication for debugging"""
@@ -405,23 +625,23 @@ class DS620Updater:
             self.ep_out.write(b'\x1b')
             self.logger.debug("✓ Successfully wrote single ESC byte")
         except Exception as e:
-            self.logger.debug(f"✗ Failed to write single byte: {e}")
+            self.logger.debug("✗ Failed to write single byte: %s", e)
             
         # Test 2: Simple string
         try:
             self.ep_out.write(b'PSTATUS\r\n')
             self.logger.debug("✓ Successfully wrote simple command")
         except Exception as e:
-            self.logger.debug(f"✗ Failed to write simple command: {e}")
+            self.logger.debug("✗ Failed to write simple command: %s", e)
             
         # Test 3: Try to read any response
         try:
             data = self.ep_in.read(64, timeout=1000)
-            self.logger.debug(f"✓ Read {len(data)} bytes: {data.hex()}")
+            self.logger.debug("✓ Read %d bytes: %s", len(data), data.hex())
         except usb.core.USBTimeoutError:
             self.logger.debug("✗ No data available to read (timeout)")
         except Exception as e:
-            self.logger.debug(f"✗ Read error: {e}")
+            self.logger.debug("✗ Read error: %s", e)
             
     def send_printer_class_request(self):
         """Send USB printer class-specific requests"""
@@ -444,38 +664,42 @@ class DS620Updater:
                     # First two bytes are length (big-endian)
                     id_len = (device_id[0] << 8) | device_id[1]
                     id_string = device_id[2:2+id_len].decode('ascii', errors='ignore')
-                    self.logger.info(f"Device ID: {id_string}")
+                    self.logger.info("Device ID: %s", id_string)
             except Exception as e:
-                self.logger.debug(f"GET_DEVICE_ID failed: {e}")
+                self.logger.debug("GET_DEVICE_ID failed: %s", e)
             
             # Get port status
             try:
                 # wLength: 1 (status byte)
                 status = self.device.ctrl_transfer(0xA1, GET_PORT_STATUS, 0, 0, 1, timeout=1000)
                 if status:
-                    self.logger.info(f"Port status: 0x{status[0]:02x}")
+                    self.logger.info("Port status: 0x%02x", status[0])
                     # Bit 5: Paper Empty
                     # Bit 4: Select
                     # Bit 3: Not Error
                     if status[0] & 0x20:
                         self.logger.warning("Paper empty detected")
             except Exception as e:
-                self.logger.debug(f"GET_PORT_STATUS failed: {e}")
+                self.logger.debug("GET_PORT_STATUS failed: %s", e)
                 
             # Try soft reset for 0x1452 devices
-            if self.vendor_id == 0x1452:
+            if self.alt_vendor:
                 self.logger.info("Sending SOFT_RESET for vendor 0x1452...")
                 try:
                     # bmRequestType: 0x21 (Host to Device, Class, Interface)
                     # No data phase
                     self.device.ctrl_transfer(0x21, SOFT_RESET, 0, 0, timeout=1000)
-                    time.sleep(0.5)  # Give device time to reset
+                    
+                    # Give device time to reset; the control pipe answers
+                    # while it is still resetting, so there is nothing to poll
+                    # and readiness is confirmed by the PSTATUS reply later
+                    time.sleep(SOFT_RESET_SETTLE)
                     self.logger.info("Soft reset completed")
                 except Exception as e:
-                    self.logger.debug(f"SOFT_RESET failed: {e}")
+                    self.logger.debug("SOFT_RESET failed: %s", e)
                     
         except Exception as e:
-            self.logger.warning(f"Printer class requests failed: {e}")
+            self.logger.warning("Printer class requests failed: %s", e)
     
     def initialize_printer(self):
         """Initialize printer communication"""
@@ -485,11 +709,11 @@ class DS620Updater:
         self.send_printer_class_request()
         
         # Run raw USB test in debug mode
-        if self.logger.level == logging.DEBUG:
+        if self.debug_enabled:
             self.test_raw_usb()
         
         # Special handling for vendor 0x1452
-        if hasattr(self, 'vendor_id') and self.vendor_id == 0x1452:
+        if self.alt_vendor:
             self.logger.info("Using initialization for vendor 0x1452")
             # Try longer timeout and different delays
             timeout = 10000  # 10 seconds
@@ -497,187 +721,233 @@ class DS620Updater:
             # Add extra delay after USB setup for 0x1452
             time.sleep(1.0)
             
-            if self.logger.level == logging.DEBUG:
+            if self.debug_enabled:
                 self.logger.debug("Added 1 second delay for VID 0x1452 initialization")
         else:
             timeout = 5000  # 5 seconds
         
-        # Send STATUS command to verify communication
+        # Send STATUS command to verify communication; the read waits for
+        # the reply, so no fixed delay is needed before it
         self.send_command("PSTATUS")
-        time.sleep(0.5)
         response = self.read_response(timeout=timeout)
         
         if response:
             self.logger.info("Printer communication initialized")
-            if self.logger.level == logging.DEBUG:
-                self.logger.debug(f"STATUS response: {response.decode('ascii', errors='replace')}")
-                self.logger.debug(f"Response hex: {response.hex()}")
+            if self.debug_enabled:
+                self.logger.debug("STATUS response: %s", response.decode('ascii', errors='replace'))
+                self.logger.debug("Response hex: %s", response.hex())
         else:
             self.logger.warning("No response to STATUS command, continuing anyway...")
             
     def send_command(self, command, data=None):
-        """Send command to printer"""
-        # Use standard DNP format for all vendors
-        cmd_bytes = bytes([ESC]) + command.encode('ascii')
-        
-        # Ensure command is exactly 23 bytes (24 total with ESC)
-        if len(cmd_bytes) < 24:
-            cmd_bytes += b' ' * (24 - len(cmd_bytes))
-        
-        if data:
-            cmd_bytes += data
-        cmd_bytes += CRLF
+        """Send command (str, or pre-encoded ASCII bytes) to printer"""
+        # Use standard DNP format for all vendors; the padded frame for each
+        # command is built once and reused on every later send
+        frame = pack_command(command)
+        cmd_bytes = frame + data + CRLF if data else frame + CRLF
         
         # Enhanced debug logging
-        if self.logger.level == logging.DEBUG:
-            self.logger.debug(f"Sending command: {command}")
-            self.logger.debug(f"Raw hex: {cmd_bytes.hex()}")
-            self.logger.debug(f"ASCII: {cmd_bytes.decode('ascii', errors='replace')}")
-            self.logger.debug(f"Total length: {len(cmd_bytes)} bytes")
-            
-            # Special debugging for 0x1452
-            if hasattr(self, 'vendor_id') and self.vendor_id == 0x1452:
-                self.logger.debug(f"VID 0x1452: Using standard DNP format")
+        if self.debug_enabled:
+            self.logger.debug("Sending command: %s", command)
+            self.logger.debug("Raw hex: %s", cmd_bytes.hex())
+            self.logger.debug("ASCII: %s", cmd_bytes.decode('ascii', errors='replace'))
+            self.logger.debug("Total length: %d bytes", len(cmd_bytes))
         
         try:
             bytes_written = self.ep_out.write(cmd_bytes)
-            if self.logger.level == logging.DEBUG:
-                self.logger.debug(f"Wrote {bytes_written} bytes to endpoint 0x{self.ep_out.bEndpointAddress:02x}")
+            if self.debug_enabled:
+                self.logger.debug("Wrote %d bytes to endpoint 0x%02x", bytes_written, self.ep_out.bEndpointAddress)
         except Exception as e:
-            self.logger.error(f"Failed to write to USB: {e}")
+            self.logger.error("Failed to write to USB: %s", e)
             raise
         
-    def read_response(self, timeout=5000, retry_count=3):
-        """Read response from printer with retry logic"""
-        for attempt in range(retry_count):
-            try:
-                # First try to read potential length field
-                initial_read = self.ep_in.read(1024, timeout)
-                response = bytes(initial_read)
-                
-                if self.logger.level == logging.DEBUG:
-                    self.logger.debug(f"Read {len(response)} bytes from endpoint 0x{self.ep_in.bEndpointAddress:02x}")
-                    self.logger.debug(f"Raw hex: {response.hex()}")
-                    self.logger.debug(f"ASCII: {response.decode('ascii', errors='replace')}")
-                    
-                    # Extra debugging for 0x1452
-                    if hasattr(self, 'vendor_id') and self.vendor_id == 0x1452:
-                        self.logger.debug(f"VID 0x1452 response analysis:")
-                        if len(response) > 0:
-                            self.logger.debug(f"  First byte: 0x{response[0]:02x}")
-                            self.logger.debug(f"  Looks like error: {'yes' if response[0] in [0x15, 0x06] else 'no'}")
+    def write_payload(self, data, header=b''):
+        """Send bulk payload data, optionally preceded by a header, through
+        the persistent transmit buffer
+        
+        pyusb hands an array('B') to libusb without copying, while any other
+        buffer type is converted first (memoryviews byte by byte), so data is
+        copied into one reused array with a single memcpy instead.
+        """
+        size = len(header) + len(data)
+        buf = self.tx_buffer
+        if len(buf) > size:
+            del buf[size:]
+        elif len(buf) < size:
+            buf.frombytes(bytes(size - len(buf)))
+            
+        with memoryview(buf) as view:
+            view[:len(header)] = header
+            view[len(header):] = data
+            
+        # A write that times out fails as a whole, so the timeout grows with
+        # the payload rather than being one flat value for every size
+        timeout = max(BULK_WRITE_TIMEOUT_MIN, size // MIN_BYTES_PER_MS)
+        return self.ep_out.write(buf, timeout=timeout)
+        
+    def read_response(self, timeout=5000):
+        """Read response from printer, waiting up to timeout milliseconds"""
+        try:
+            if self.rx_pending:
+                # Left over from a read that carried more than one response of
+                # a query_commands batch; only ever set inside a batch
+                response = self.rx_pending
+                self.rx_pending = b''
+            else:
+                # First try to read potential length field; pyusb fills the
+                # preallocated buffer in place rather than returning a new array
+                count = self.ep_in.read(self.rx_buffer, timeout)
+                with memoryview(self.rx_buffer) as view:
+                    response = bytes(view[:count])
+            
+            if self.debug_enabled:
+                self.logger.debug("Read %d bytes from endpoint 0x%02x", len(response), self.ep_in.bEndpointAddress)
+                self.logger.debug("Raw hex: %s", response.hex())
+                self.logger.debug("ASCII: %s", response.decode('ascii', errors='replace'))
                 
-                # Check if response starts with 8-digit length
-                if len(response) >= 8 and response[:8].decode('ascii', errors='ignore').isdigit():
-                    length = int(response[:8].decode('ascii'))
-                    self.logger.debug(f"Detected length-prefixed response: {length} bytes expected")
-                    
-                    # If we have the full response already
-                    if len(response) >= 8 + length:
-                        return response[8:8+length]
-                    
-                    # Otherwise, read the remaining data
-                    remaining = length - (len(response) - 8)
-                    if remaining > 0:
-                        more_data = self.ep_in.read(remaining, timeout)
-                        response += bytes(more_data)
-                        return response[8:8+length]
+                # Extra debugging for 0x1452
+                if self.alt_vendor:
+                    self.logger.debug("VID 0x1452 response analysis:")
+                    if len(response) > 0:
+                        self.logger.debug("  First byte: 0x%02x", response[0])
+                        self.logger.debug("  Looks like error: %s", 'yes' if response[0] in [0x15, 0x06] else 'no')
+            
+            # Check if response starts with 8-digit length (bytes.isdigit
+            # only accepts ASCII digits, so no decode is needed)
+            header = response[:8]
+            if len(header) == 8 and header.isdigit():
+                length = int(header)
+                self.logger.debug("Detected length-prefixed response: %d bytes expected", length)
                 
-                # For 0x1452, log non-standard responses
-                if hasattr(self, 'vendor_id') and self.vendor_id == 0x1452 and len(response) > 0:
-                    self.logger.warning(f"VID 0x1452: Non-standard response format")
+                # If we have the full response already
+                if len(response) >= 8 + length:
+                    # Within a batch, a remainder that starts with another
+                    # length header is the next reply; anything else, like
+                    # trailing CRLF, is not a reply and is dropped
+                    remainder = response[8+length:]
+                    if self.in_batch and len(remainder) >= 8 and remainder[:8].isdigit():
+                        self.rx_pending = remainder
+                    elif remainder and self.debug_enabled:
+                        self.logger.debug("Discarding %d bytes after response", len(remainder))
+                    return response[8:8+length]
                 
-                return response
+                # Otherwise, read the remaining data
+                remaining = length - (len(response) - 8)
+                if remaining > 0:
+                    # Grow one buffer in place and copy the payload out once
+                    buffer = bytearray(response)
+                    buffer += self.ep_in.read(remaining, timeout)
+                    with memoryview(buffer) as view:
+                        return bytes(view[8:8+length])
+            
+            # For 0x1452, log non-standard responses
+            if self.alt_vendor and len(response) > 0:
+                self.logger.warning("VID 0x1452: Non-standard response format")
+            
+            return response
+            
+        except usb.core.USBTimeoutError:
+            if self.debug_enabled:
+                self.logger.debug("Read timeout after %d ms", timeout)
+                if self.alt_vendor:
+                    self.logger.debug("VID 0x1452: No response received")
+            return None
+            
+    def query_commands(self, commands, timeout=5000):
+        """Send commands back-to-back, then read their responses in order
+        
+        Returns a list with one response (or None) per command. Once a
+        response is missing, later ones can't be matched to their commands,
+        so they are all None and whatever arrives for them is discarded.
+        """
+        self.drain_input()
+        self.in_batch = True
+        try:
+            for command in commands:
+                self.send_command(command)
                 
-            except usb.core.USBTimeoutError:
-                if attempt < retry_count - 1:
-                    self.logger.debug(f"Read timeout, retrying... ({attempt + 1}/{retry_count})")
-                    time.sleep(0.1)
-                else:
-                    if self.logger.level == logging.DEBUG:
-                        self.logger.debug(f"Read timeout after {retry_count} attempts")
-                        if hasattr(self, 'vendor_id') and self.vendor_id == 0x1452:
-                            self.logger.debug("VID 0x1452: No response received")
-                    return None
-        return None
+            responses = []
+            for _ in commands:
+                response = self.read_response(timeout=timeout)
+                if response is None:
+                    break
+                responses.append(response)
+        finally:
+            self.in_batch = False
             
+        if len(responses) < len(commands):
+            self.logger.warning("No response to %s, ignoring the rest of the batch",
+                                commands[len(responses)])
+            self.drain_input()
+        else:
+            self.rx_pending = b''
+        return responses + [None] * (len(commands) - len(responses))
+        
+    def response_text(self, response):
+        """Return a printer response as text without surrounding padding"""
+        # Trim on the bytes so only the payload is decoded
+        return response.strip(b'\x00\r\n ').decode('ascii', errors='ignore')
+        
     def get_printer_info(self):
         """Get printer information"""
         self.logger.info("Getting printer information...")
         
-        # Get firmware version using PTBL_RDVersion
-        self.send_command("PTBL_RDVersion")
-        time.sleep(0.1)
-        response = self.read_response()
-        if response:
-            self.logger.info(f"Current firmware version: {response.decode('ascii', errors='ignore').strip()}")
-            
-        # Get firmware version using PINFO
-        self.send_command("PINFO  FVER")
-        time.sleep(0.1)
-        response = self.read_response()
-        if response:
-            self.logger.info(f"Current firmware (PINFO): {response.decode('ascii', errors='ignore').strip()}")
-            
-        # Get serial number
-        self.send_command("PINFO  SERIAL_NUMBER")
-        time.sleep(0.1)
-        response = self.read_response()
-        if response:
-            self.logger.info(f"Serial number: {response.decode('ascii', errors='ignore').strip()}")
-            
-        # Get unit status
-        self.send_command("PINFO  UNIT_STATUS")
-        time.sleep(0.1)
-        response = self.read_response()
-        if response:
-            self.logger.info(f"Unit status: {response.decode('ascii', errors='ignore').strip()}")
+        info_queries = [
+            ("PTBL_RDVersion", "Current firmware version"),
+            ("PINFO  FVER", "Current firmware (PINFO)"),
+            ("PINFO  SERIAL_NUMBER", "Serial number"),
+            ("PINFO  UNIT_STATUS", "Unit status"),
+        ]
+        
+        responses = self.query_commands([cmd for cmd, _ in info_queries])
+        for (cmd, desc), response in zip(info_queries, responses):
+            if response:
+                self.logger.info("%s: %s", desc, self.response_text(response))
             
-    def check_cwd_versions(self):
-        """Check CWD versions before update"""
+    def check_cwd_versions(self, pipelined=True):
+        """Check CWD versions before update, returning {cwd_file: version response}
+        
+        Pipelined replies are only matched to their queries by order, so
+        with pipelined=False each query is answered before the next is sent.
+        """
         self.logger.info("Checking CWD versions...")
         
-        # CWD file mappings to their IDs
-        cwd_mappings = {
-            "DS620_PD_300_0111.cwd": "001",
-            "DS620_PD_600_0111.cwd": "002", 
-            "DS620_PD_610_0111.cwd": "003",
-            "DS620_SD_300_0111.cwd": "004",
-            "DS620_SD_600_0111.cwd": "005",
-            "DS620_SD_610_0111.cwd": "006"
-        }
-        
-        for cwd_file, cwd_id in cwd_mappings.items():
-            # Check version
-            cmd = f"PTBL_RDCWD{cwd_id}_Version"
-            self.send_command(cmd)
-            time.sleep(0.1)
-            response = self.read_response()
-            if response:
-                self.logger.info(f"{cwd_file} version: {response.decode('ascii', errors='ignore').strip()}")
-                
-            # Check checksum
-            cmd = f"PTBL_RDCWD{cwd_id}_Checksum"
-            self.send_command(cmd)
-            time.sleep(0.1)
-            response = self.read_response()
-            if response:
-                self.logger.debug(f"{cwd_file} checksum: {response.decode('ascii', errors='ignore').strip()}")
+        # Version and checksum queries for every CWD, sent as one burst
+        # unless each reply has to be tied to its query
+        commands = []
+        for _, version_cmd, checksum_cmd in CWD_QUERIES:
+            commands.append(version_cmd)
+            commands.append(checksum_cmd)
+        if pipelined:
+            responses = self.query_commands(commands)
+        else:
+            responses = [self.query_commands([command])[0] for command in commands]
+        
+        versions = {}
+        for i, (cwd_file, _, _) in enumerate(CWD_QUERIES):
+            version, checksum = responses[2 * i], responses[2 * i + 1]
+            if version:
+                versions[cwd_file] = version
+                self.logger.info("%s version: %s", cwd_file, self.response_text(version))
+            if checksum and self.debug_enabled:
+                self.logger.debug("%s checksum: %s", cwd_file, self.response_text(checksum))
+        return versions
             
     def enter_update_mode(self):
         """Enter firmware update mode"""
         self.logger.info("Entering firmware update mode...")
         
-        # Send flash rewrite command
+        # Send flash rewrite command; stale replies must not pass for its ack
+        self.drain_input()
         self.send_command("PFW_UPDFLASH_REWRITE")
-        time.sleep(WAIT_CHMODE)
         
-        response = self.read_response(timeout=15000)  # 15 second timeout
+        # The read returns as soon as the printer has switched modes
+        response = self.read_response(timeout=45000)  # Mode switch can take a while
         if response:
             self.logger.info("Entered update mode (LED should be flashing green)")
-            if self.logger.level == logging.DEBUG:
-                self.logger.debug(f"Update mode response: {response.hex()}")
-                self.logger.debug(f"Update mode response ASCII: {response.decode('ascii', errors='replace')}")
+            if self.debug_enabled:
+                self.logger.debug("Update mode response: %s", response.hex())
+                self.logger.debug("Update mode response ASCII: %s", response.decode('ascii', errors='replace'))
             return True
         else:
             self.logger.error("Failed to enter update mode")
@@ -690,72 +960,97 @@ class DS620Updater:
             
     def send_firmware(self):
         """Send S-Record firmware file using PTBL_WTCTRLD_UPDATE command"""
-        self.logger.info(f"Sending firmware file: {self.firmware_path}")
+        self.logger.info("Sending firmware file: %s", self.firmware_path)
         
+        firmware_data = None
+        firmware_view = None
         try:
-            # Read entire firmware file
+            # Map the firmware file read-only; pages are faulted in from the
+            # page cache as each batch is sent instead of copied up front
             with open(self.firmware_path, 'rb') as f:
-                firmware_data = f.read()
+                firmware_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Stream through the mapping: aggressive readahead, pages behind
+            # the send position may be dropped (madvise needs Python 3.8+).
+            # WILLNEED starts reading the whole image in the background now,
+            # so the disk keeps filling the page cache while USB transmits
+            if hasattr(firmware_data, 'madvise'):
+                firmware_data.madvise(mmap.MADV_SEQUENTIAL)
+                firmware_data.madvise(mmap.MADV_WILLNEED)
+            firmware_view = memoryview(firmware_data)
                 
-            self.logger.info(f"Firmware size: {len(firmware_data)} bytes ({len(firmware_data)/1024/1024:.1f} MB)")
+            firmware_size = len(firmware_data)
+            self.logger.info("Firmware size: %d bytes (%.1f MB)", firmware_size, firmware_size/1024/1024)
             
             # Send firmware update command with data length
             # Using PTBL_WTCTRLD_UPDATE for main firmware
             # Send command first (24 bytes)
+            self.drain_input()
             self.send_command("PTBL_WTCTRLD_UPDATE")
             time.sleep(0.1)
             
             # Then send length + data
-            length_bytes = f"{len(firmware_data):08d}".encode('ascii')
-            
-            # Send length followed by firmware data in chunks
-            self.ep_out.write(length_bytes)
-            
-            chunk_size = 4096
-            total_sent = 0
-            start_time = time.time()
+            length_bytes = pack_length(firmware_size)
+            
+            # Each write hands libusb a whole chunk; it splits the transfer
+            # into URBs and keeps them all queued on the endpoint
+            # A chunk that isn't a whole number of packets ends in a short
+            # packet, which the printer may take as the end of the transfer,
+            # so only the last chunk of the stream may be short
+            packet_size = self.ep_out.wMaxPacketSize
+            chunk_size = max(packet_size, self.chunk_size - self.chunk_size % packet_size)
+            if chunk_size != self.chunk_size:
+                self.logger.warning("Chunk size %d is not a multiple of the %d-byte packet size, using %d",
+                                    self.chunk_size, packet_size, chunk_size)
+            
+            start_time = time.monotonic()
             last_log_time = start_time
             
-            while total_sent < len(firmware_data):
-                chunk = firmware_data[total_sent:total_sent + chunk_size]
-                self.ep_out.write(chunk)
-                total_sent += len(chunk)
+            # The length goes out in front of the first chunk, in the same
+            # transfer, so that chunk carries 8 bytes less firmware
+            first_end = min(chunk_size - len(length_bytes), firmware_size)
+            self.write_payload(firmware_view[:first_end], header=length_bytes)
+            total_sent = first_end
+            
+            for offset in range(first_end, firmware_size, chunk_size):
+                total_sent = offset + self.write_payload(firmware_view[offset:offset + chunk_size])
                 
                 # Progress indicator with time estimate
-                current_time = time.time()
+                current_time = time.monotonic()
                 if current_time - last_log_time >= 2.0:  # Log every 2 seconds
-                    progress = (total_sent / len(firmware_data)) * 100
+                    progress = (total_sent / firmware_size) * 100
                     elapsed = current_time - start_time
                     if total_sent > 0:
                         rate = total_sent / elapsed  # bytes per second
-                        remaining_bytes = len(firmware_data) - total_sent
+                        remaining_bytes = firmware_size - total_sent
                         eta = remaining_bytes / rate
-                        self.logger.info(f"Progress: {progress:.1f}% | {total_sent/1024/1024:.1f}/{len(firmware_data)/1024/1024:.1f} MB | "
-                                       f"Speed: {rate/1024:.1f} KB/s | ETA: {eta:.0f}s")
+                        self.logger.info("Progress: %.1f%% | %.1f/%.1f MB | Speed: %.1f KB/s | ETA: %.0fs",
+                                         progress, total_sent/1024/1024, firmware_size/1024/1024,
+                                         rate/1024, eta)
                     else:
-                        self.logger.info(f"Progress: {progress:.1f}% ({total_sent}/{len(firmware_data)})")
+                        self.logger.info("Progress: %.1f%% (%d/%d)", progress, total_sent, firmware_size)
                     last_log_time = current_time
-                    
-                # Small delay between chunks
-                time.sleep(0.001)
                 
             # Final progress
-            elapsed = time.time() - start_time
-            self.logger.info(f"Firmware transmission complete in {elapsed:.1f} seconds")
-            self.logger.info(f"Average speed: {len(firmware_data)/elapsed/1024:.1f} KB/s")
+            elapsed = time.monotonic() - start_time
+            self.logger.info("Firmware transmission complete in %.1f seconds", elapsed)
+            self.logger.info("Average speed: %.1f KB/s", firmware_size/elapsed/1024)
             
-            # Wait for response
+            # Wait for response; the read blocks until the printer answers
             self.logger.info("Waiting for printer to process firmware...")
-            time.sleep(1.0)
-            response = self.read_response(timeout=10000)
+            response = self.read_response(timeout=30000)
             if response:
-                self.logger.debug(f"Firmware update response: {response}")
+                self.logger.debug("Firmware update response: %r", response)
                 
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to send firmware: {e}")
+            self.logger.error("Failed to send firmware: %s", e)
             return False
+        finally:
+            if firmware_view is not None:
+                firmware_view.release()
+            if firmware_data is not None:
+                firmware_data.close()
             
     def program_flash(self):
         """Execute flash programming"""
@@ -767,82 +1062,170 @@ class DS620Updater:
         # Wait for programming to complete
         self.logger.info("Waiting for flash programming to complete (this may take several minutes)...")
         
-        # Poll update status
-        start_time = time.time()
-        timeout = 300  # 5 minutes timeout
+        # Poll update status, backing off while the printer is still busy
+        deadline = time.monotonic() + 300  # 5 minutes timeout
+        poll_interval = POLL_INTERVAL_MIN
+        last_response = None
         
-        while time.time() - start_time < timeout:
-            # Check update status
+        while time.monotonic() < deadline:
+            # Check update status; the read itself waits for the answer
             self.send_command("PINFO  DUNIT_UPD_STS")
-            time.sleep(1.0)
             response = self.read_response()
             
             if response:
-                status = response.decode('ascii', errors='ignore').strip()
-                self.logger.debug(f"Update status: {status}")
-                
-                if "COMPLETE" in status or "FINISH" in status:
-                    self.logger.info("Flash programming complete")
-                    return True
-                elif "ERROR" in status or "FAIL" in status:
-                    self.logger.error(f"Flash programming failed: {status}")
-                    return False
+                # An unchanged reply was already checked; a new one means
+                # progress was made, so poll quickly again. The status is
+                # classified on the raw bytes and only decoded for logging
+                if response != last_response:
+                    last_response = response
+                    poll_interval = POLL_INTERVAL_MIN
+                    if self.debug_enabled:
+                        self.logger.debug("Update status: %s", self.response_text(response))
                     
-            time.sleep(2.0)
+                    if b"COMPLETE" in response or b"FINISH" in response:
+                        self.logger.info("Flash programming complete")
+                        return True
+                    elif b"ERROR" in response or b"FAIL" in response:
+                        self.logger.error("Flash programming failed: %s", self.response_text(response))
+                        return False
+            else:
+                # The read already waited out its full timeout; ask again
+                # straight away rather than sleeping on top of it
+                continue
+                
+            time.sleep(poll_interval)
+            poll_interval = min(POLL_INTERVAL_MAX, poll_interval * 1.5)
             
         self.logger.error("Flash programming timed out")
         return False
             
-    def update_cwd_files(self):
-        """Update CWD configuration files"""
-        cwd_files = [
-            "DS620_PD_300_0111.cwd",
-            "DS620_PD_600_0111.cwd",
-            "DS620_PD_610_0111.cwd",
-            "DS620_SD_300_0111.cwd",
-            "DS620_SD_600_0111.cwd",
-            "DS620_SD_610_0111.cwd"
-        ]
+    def read_cwd_payload(self, cwd_path, size):
+        """Read a CWD file of the given size into a buffer that starts with
+        its 8-digit length"""
+        payload = bytearray(8 + size)
+        payload[:8] = pack_length(size)
         
-        for cwd_file in cwd_files:
-            cwd_path = self.cwd_dir / cwd_file
-            if not cwd_path.exists():
-                self.logger.warning(f"CWD file not found: {cwd_file}")
-                continue
-                
-            self.logger.info(f"Updating CWD file: {cwd_file}")
+        # Read straight into the buffer behind the header, no concatenation
+        with open(cwd_path, 'rb', buffering=0) as f, memoryview(payload) as view:
+            count = f.readinto(view[8:])
+            
+        # A short read would send the right length header followed by zero
+        # padding, i.e. a corrupted CWD table
+        if count != size:
+            raise OSError(f"{cwd_path.name}: read {count} of {size} bytes")
+        return payload
+        
+    def cwd_file_sizes(self):
+        """Return the sizes of the CWD files present in the CWD directory"""
+        sizes = {}
+        if self.cwd_dir is None:
+            return sizes
             
-            # Read CWD file
+        try:
+            # One directory read instead of an exists() and stat() per file
+            with os.scandir(self.cwd_dir) as entries:
+                for entry in entries:
+                    if entry.name in CWD_FILES and entry.is_file():
+                        sizes[entry.name] = entry.stat().st_size
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return sizes
+            
+    def cwd_file_version(self, cwd_path):
+        """Return the version of a CWD file, or None if its header is not a
+        CWD header"""
+        try:
             with open(cwd_path, 'rb') as f:
-                cwd_data = f.read()
+                header = f.read(len(CWD_HEADER_MAGIC))
+        except OSError:
+            return None
+        if header != CWD_HEADER_MAGIC:
+            return None
+            
+        # The header holds no version field; the version is the last field
+        # of the file name (0111 in DS620_PD_300_0111.cwd)
+        return cwd_path.stem.rsplit('_', 1)[-1]
+        
+    def cwd_is_current(self, cwd_path, version):
+        """Check whether a printer's CWD version response is exactly the
+        version of a CWD file"""
+        tag = self.cwd_file_version(cwd_path)
+        if not version or tag is None:
+            return False
+            
+        # The version is the reply's last field, with or without a dot
+        # (0111, 01.11 or Ver 01.11)
+        fields = self.response_text(version).split()
+        return bool(fields) and fields[-1].replace('.', '', 1) == tag
+        
+    def update_cwd_files(self, current_versions=None):
+        """Update CWD configuration files, skipping those that current_versions
+        (as returned by check_cwd_versions(pipelined=False)) shows are already
+        installed"""
+        # One directory scan gives both which files exist and their sizes
+        cwd_sizes = self.cwd_file_sizes()
+        
+        cwd_paths = []
+        for cwd_path in self.cwd_paths:
+            if cwd_path.name not in cwd_sizes:
+                self.logger.warning("CWD file not found: %s", cwd_path.name)
+            elif current_versions and self.cwd_is_current(cwd_path, current_versions.get(cwd_path.name)):
+                self.logger.info("Skipping %s: already at version %s", cwd_path.name,
+                                 self.response_text(current_versions[cwd_path.name]))
+            else:
+                cwd_paths.append(cwd_path)
                 
-            # Send update command first (24 bytes)
-            self.send_command("PTBL_WTCTRLD_UPDATE_CW")
-            time.sleep(0.1)
+        if not cwd_paths:
+            return
             
-            # Then send length + CWD data
-            length_bytes = f"{len(cwd_data):08d}".encode('ascii')
-            self.ep_out.write(length_bytes + cwd_data)
-            time.sleep(WAIT_UPDATE)
+        # Read the next CWD file in the background while the printer is busy
+        # accepting the current one
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self.read_cwd_payload, cwd_paths[0], cwd_sizes[cwd_paths[0].name])
             
-            # Check response
-            response = self.read_response()
-            if response:
-                self.logger.info(f"CWD update complete: {cwd_file}")
-            else:
-                self.logger.warning(f"No response for CWD update: {cwd_file}")
+            for index, cwd_path in enumerate(cwd_paths):
+                cwd_file = cwd_path.name
+                self.logger.info("Updating CWD file: %s", cwd_file)
+                
+                # CWD file, already framed with its length
+                try:
+                    payload = pending.result()
+                except OSError as e:
+                    self.logger.error("Skipping CWD file %s: %s", cwd_file, e)
+                    payload = None
+                if index + 1 < len(cwd_paths):
+                    next_path = cwd_paths[index + 1]
+                    pending = executor.submit(self.read_cwd_payload, next_path, cwd_sizes[next_path.name])
+                if payload is None:
+                    continue
+                    
+                # Send update command first (24 bytes), with nothing stale
+                # left that could pass for the ack
+                self.drain_input()
+                self.send_command("PTBL_WTCTRLD_UPDATE_CW")
+                
+                # Then send length + CWD data in one transfer; the printer NAKs
+                # until it is ready
+                self.write_payload(payload)
+                
+                # Wait for the printer to acknowledge the update
+                response = self.read_response(timeout=CWD_UPDATE_TIMEOUT)
+                if response:
+                    self.logger.info("CWD update complete: %s", cwd_file)
+                else:
+                    self.logger.warning("No response for CWD update: %s", cwd_file)
                 
     def reset_printer(self):
         """Reset printer to complete update"""
         self.logger.info("Resetting printer...")
         
-        # Send CWD reset command first
+        # Send CWD reset command first; give it up to 0.5 s to acknowledge
         self.send_command("PTBL_WTCTRLD_CWE_RESET")
-        time.sleep(0.5)
+        self.read_response(timeout=500)
         
         # Send cleanup command
         self.send_command("PTBL_CL")
-        time.sleep(0.5)
+        self.read_response(timeout=500)
         
         # Send printer reset command
         self.send_command("PCNTRL PRINTER_RESET")
@@ -850,24 +1233,63 @@ class DS620Updater:
         
         self.logger.info("Printer reset complete (LED should return to solid green)")
         
+    def wait_for_reenumeration(self):
+        """Wait for the printer to come back after a reset and switch to the
+        device now on the bus
+        
+        The printer counts as back once it has left the bus and returned,
+        shows up at a new address, or is still present after RESTART_TIMEOUT
+        (a reset that keeps its address). Returns False if it is not on the
+        bus by REAPPEAR_TIMEOUT.
+        """
+        old_device = self.device
+        old_address = old_device.address
+        gone = False
+        start = time.monotonic()
+        while True:
+            device = usb.core.find(idVendor=self.vendor_id, idProduct=self.product_id)
+            elapsed = time.monotonic() - start
+            if device is None:
+                gone = True
+            elif gone or device.address != old_address or elapsed >= RESTART_TIMEOUT:
+                # A new address means it already re-enumerated during the reset wait
+                try:
+                    usb.util.dispose_resources(old_device)
+                except usb.core.USBError:
+                    pass
+                self.device = device
+                self.sysfs_name = None
+                self.ep_out = None
+                self.ep_in = None
+                self.logger.info("Printer is back on USB")
+                return True
+            if elapsed >= REAPPEAR_TIMEOUT:
+                return False
+            time.sleep(0.1)
+        
     def verify_update(self):
         """Verify firmware update was successful"""
         self.logger.info("Verifying firmware update...")
         
-        # Wait for printer to fully restart
-        time.sleep(5.0)
-        
+        # The old handle goes stale once the printer re-enumerates, so wait
+        # for the new device and set it up again before querying it
+        if not self.wait_for_reenumeration():
+            self.logger.error("Printer did not come back on USB after reset")
+            return False
+            
+        if not self.setup_usb():
+            return False
+            
         # Get new firmware version using PTBL command
         self.send_command("PTBL_RDVersion")
-        time.sleep(0.1)
-        response = self.read_response()
+        response = self.read_response(timeout=VERIFY_READ_TIMEOUT)
         
         if response:
-            new_version = response.decode('ascii', errors='ignore').strip()
-            self.logger.info(f"New firmware version: {new_version}")
+            new_version = self.response_text(response)
+            self.logger.info("New firmware version: %s", new_version)
             
-            # Check if version contains "04.52"
-            if "04.52" in new_version or "0452" in new_version:
+            # Check the raw response for "04.52", no decode needed
+            if any(token in response for token in FIRMWARE_VERSION_TOKENS):
                 self.logger.info("Firmware update successful!")
                 return True
             else:
@@ -877,10 +1299,45 @@ class DS620Updater:
             self.logger.error("Could not verify firmware version")
             return False
             
+    def scan_firmware_file(self):
+        """Return (size, S-Record line count, has target version) for the
+        firmware file, or None if it does not exist"""
+        if not self.firmware_path.exists():
+            return None
+            
+        # Scan raw bytes block by block instead of building a str object per
+        # line; only the first block is kept, for the version probe
+        size = 0
+        line_count = 0
+        last_byte = b''
+        with open(self.firmware_path, 'rb') as f:
+            head = block = f.read(SREC_SCAN_BLOCK)
+            while block:
+                size += len(block)
+                line_count += block.count(b'\n')
+                last_byte = block[-1:]
+                block = f.read(SREC_SCAN_BLOCK)
+        if size and last_byte != b'\n':
+            line_count += 1
+            
+        # Extract version from S-Record if possible
+        has_version = False
+        for line in head.split(b'\n', 100)[:100]:  # Check first 100 lines
+            if b"DS620" in line and any(token in line for token in FIRMWARE_VERSION_TOKENS):
+                has_version = True
+                break
+        return size, line_count, has_version
+        
     def dry_run(self):
         """Perform a dry run - check printer status and versions without updating"""
         self.logger.info("=== DRY RUN MODE - No changes will be made ===")
         
+        # The local file checks do not need the printer, so run them while
+        # it is found and set up
+        executor = ThreadPoolExecutor(max_workers=2)
+        firmware_scan = executor.submit(self.scan_firmware_file)
+        cwd_scan = executor.submit(self.cwd_file_sizes)
+        
         try:
             # Find and setup printer
             if not self.find_printer():
@@ -899,42 +1356,31 @@ class DS620Updater:
             
             self.logger.info("\n--- Firmware File Information ---")
             # Check firmware file
-            if self.firmware_path.exists():
-                with open(self.firmware_path, 'r') as f:
-                    lines = f.readlines()
-                self.logger.info(f"Firmware file: {self.firmware_path}")
-                self.logger.info(f"S-Record lines: {len(lines)}")
-                self.logger.info(f"File size: {self.firmware_path.stat().st_size} bytes")
-                
-                # Extract version from S-Record if possible
-                for line in lines[:100]:  # Check first 100 lines
-                    if "DS620" in line and ("04.52" in line or "0452" in line):
-                        self.logger.info(f"Firmware version in file: 04.52")
-                        break
+            firmware_info = firmware_scan.result()
+            if firmware_info:
+                file_size, line_count, has_version = firmware_info
+                self.logger.info("Firmware file: %s", self.firmware_path)
+                self.logger.info("S-Record lines: %d", line_count)
+                self.logger.info("File size: %d bytes", file_size)
+                if has_version:
+                    self.logger.info("Firmware version in file: 04.52")
             else:
-                self.logger.error(f"Firmware file not found: {self.firmware_path}")
+                self.logger.error("Firmware file not found: %s", self.firmware_path)
                 
             self.logger.info("\n--- CWD Files Check ---")
             # Check CWD files
-            cwd_files = [
-                "DS620_PD_300_0111.cwd",
-                "DS620_PD_600_0111.cwd",
-                "DS620_PD_610_0111.cwd",
-                "DS620_SD_300_0111.cwd",
-                "DS620_SD_600_0111.cwd",
-                "DS620_SD_610_0111.cwd"
-            ]
+            cwd_sizes = cwd_scan.result()
             
             found_files = 0
-            for cwd_file in cwd_files:
-                cwd_path = self.cwd_dir / cwd_file
-                if cwd_path.exists():
-                    self.logger.info(f"✓ {cwd_file} - {cwd_path.stat().st_size} bytes")
+            for cwd_file in CWD_FILES:
+                size = cwd_sizes.get(cwd_file)
+                if size is not None:
+                    self.logger.info("✓ %s - %d bytes", cwd_file, size)
                     found_files += 1
                 else:
-                    self.logger.warning(f"✗ {cwd_file} - NOT FOUND")
+                    self.logger.warning("✗ %s - NOT FOUND", cwd_file)
                     
-            self.logger.info(f"\nFound {found_files}/{len(cwd_files)} CWD files")
+            self.logger.info("\nFound %d/%d CWD files", found_files, len(CWD_FILES))
             
             self.logger.info("\n--- Additional Status Checks ---")
             # Try additional read-only commands
@@ -949,12 +1395,11 @@ class DS620Updater:
                 ("PMNT_RDUSB_ISERI_SET", "USB serial setting")
             ]
             
-            for cmd, desc in read_only_commands:
-                self.send_command(cmd)
-                time.sleep(0.1)
-                response = self.read_response()
+            # All queries go out back to back, then the answers are read in order
+            responses = self.query_commands([cmd for cmd, _ in read_only_commands])
+            for (cmd, desc), response in zip(read_only_commands, responses):
                 if response:
-                    self.logger.info(f"{desc}: {response.decode('ascii', errors='ignore').strip()}")
+                    self.logger.info("%s: %s", desc, self.response_text(response))
                     
             self.logger.info("\n--- Dry Run Summary ---")
             self.logger.info("✓ Printer communication successful")
@@ -969,9 +1414,11 @@ class DS620Updater:
             return True
             
         except Exception as e:
-            self.logger.error(f"Dry run failed with error: {e}")
+            self.logger.error("Dry run failed with error: %s", e)
             return False
         finally:
+            executor.shutdown(wait=False)
+            
             # Release USB resources
             if self.device:
                 usb.util.dispose_resources(self.device)
@@ -981,26 +1428,23 @@ class DS620Updater:
         if action == 'stop':
             # Check if CUPS is running first
             try:
-                result = subprocess.run(['systemctl', 'is-active', 'cups'], 
-                                      capture_output=True, text=True)
-                if result.stdout.strip() == 'active':
+                if self.cups_service_active():
                     self.cups_was_running = True
                     self.logger.info("Stopping CUPS service...")
                     
                     # Stop cups-browsed first if it exists
-                    subprocess.run(['sudo', 'systemctl', 'stop', 'cups-browsed'], 
-                                 capture_output=True)
+                    self.control_unit('stop', 'cups-browsed', check=False)
                     
                     # Stop main CUPS service
-                    subprocess.run(['sudo', 'systemctl', 'stop', 'cups'], 
-                                 capture_output=True, check=True)
+                    self.control_unit('stop', 'cups')
                     
+                    # No fixed wait for the USB device to be released;
+                    # setup_usb retries while it is still busy
                     self.logger.info("CUPS service stopped")
-                    time.sleep(2)  # Give time for USB to be released
                 else:
                     self.logger.info("CUPS is not running")
             except Exception as e:
-                self.logger.warning(f"Could not stop CUPS: {e}")
+                self.logger.warning("Could not stop CUPS: %s", e)
                 
     def run_update(self):
         """Run the complete firmware update process"""
@@ -1018,17 +1462,30 @@ class DS620Updater:
             # Get initial printer info
             self.get_printer_info()
             
-            # Confirm with user
-            print("\n" + "="*60)
-            print("WARNING: Firmware update will begin.")
-            print("DO NOT disconnect USB or power during the update!")
-            print("The printer may be permanently damaged if interrupted.")
-            print("")
-            print("CUPS has been stopped to prevent interference.")
-            print("It will be restarted after the update.")
-            print("="*60 + "\n")
-            
-            response = input("Continue with firmware update? (yes/no): ")
+            # Confirm with user; the banner and prompt go out in one write
+            rule = "=" * 60
+            sys.stdout.write(
+                "\n" + rule + "\n"
+                "WARNING: Firmware update will begin.\n"
+                "DO NOT disconnect USB or power during the update!\n"
+                "The printer may be permanently damaged if interrupted.\n"
+                "\n"
+                "CUPS has been stopped to prevent interference.\n"
+                "It will be restarted after the update.\n"
+                + rule + "\n\n"
+                "Continue with firmware update? (yes/no): "
+            )
+            sys.stdout.flush()
+            
+            # Don't leave the claimed printer idle indefinitely while waiting
+            # for an answer
+            ready, _, _ = select.select([sys.stdin], [], [], CONFIRM_TIMEOUT)
+            if not ready:
+                print("")
+                self.logger.warning("No answer within %.0f seconds, update cancelled", CONFIRM_TIMEOUT)
+                return False
+                
+            response = sys.stdin.readline().strip()
             if response.lower() != 'yes':
                 self.logger.info("Update cancelled by user")
                 return False
@@ -1036,18 +1493,18 @@ class DS620Updater:
             # Mark update as in progress
             self.update_in_progress = True
             self.logger.info("Starting firmware update...")
-            update_start = time.time()
+            update_start = time.monotonic()
                 
             # Check current firmware version and CWD versions
-            self.check_cwd_versions()
+            # Skipping a CWD needs replies known to belong to their queries
+            cwd_versions = self.check_cwd_versions(pipelined=not self.skip_current_cwd)
             
             # Check printer status before update
             self.logger.info("Checking printer status before update...")
             self.send_command("PSTATUS")
-            time.sleep(0.5)
             status_response = self.read_response()
             if status_response:
-                self.logger.info(f"Printer status: {status_response.decode('ascii', errors='replace').strip()}")
+                self.logger.info("Printer status: %s", status_response.decode('ascii', errors='replace').strip())
             
             # Enter update mode
             if not self.enter_update_mode():
@@ -1062,27 +1519,28 @@ class DS620Updater:
                 return False
                 
             # Update CWD files
-            self.update_cwd_files()
+            self.update_cwd_files(cwd_versions if self.skip_current_cwd else None)
             
             # Reset printer
             self.reset_printer()
             
             # Mark update as complete
             self.update_in_progress = False
-            update_time = time.time() - update_start
+            update_time = time.monotonic() - update_start
             
             # Verify update
             if self.verify_update():
-                self.logger.info(f"Firmware update completed successfully in {update_time:.1f} seconds!")
-                print("\nIMPORTANT: Please reload paper and perform 'Paper Initialization'")
-                print("\nTo restore printer in CUPS, run: ./recover_printer.sh")
+                self.logger.info("Firmware update completed successfully in %.1f seconds!", update_time)
+                sys.stdout.write("\nIMPORTANT: Please reload paper and perform 'Paper Initialization'\n"
+                                 "\nTo restore printer in CUPS, run: ./recover_printer.sh\n")
+                sys.stdout.flush()
                 return True
             else:
                 self.logger.error("Firmware update may have failed")
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Update failed with error: {e}")
+            self.logger.error("Update failed with error: %s", e)
             self.update_in_progress = False
             return False
         finally:
@@ -1097,6 +1555,13 @@ def main():
     parser.add_argument('--dry-run', '-n', action='store_true', help='Perform dry run - check versions without updating')
     parser.add_argument('--log-file', '-l', help='Log all output to specified file')
     parser.add_argument('--no-cups', action='store_true', help='Do not automatically stop/start CUPS')
+    parser.add_argument('--out-chunk-size', type=int, default=FIRMWARE_CHUNK_SIZE,
+                        help=f'Bytes per bulk OUT write during firmware upload (default: {FIRMWARE_CHUNK_SIZE}), '
+                             'rounded down to a multiple of the endpoint packet size (512 bytes on USB 2.0 '
+                             'high speed); each write succeeds or fails as a whole, and a write that times out '
+                             'aborts the upload with no way to resume it')
+    parser.add_argument('--skip-current-cwd', action='store_true',
+                        help='Do not rewrite CWD files the printer already reports at the same version')
     
     args = parser.parse_args()
     
@@ -1115,6 +1580,10 @@ def main():
         print(f"Error: CWD directory not found: {cwd_dir}")
         sys.exit(1)
         
+    if args.out_chunk_size <= 0:
+        print(f"Error: --out-chunk-size must be positive: {args.out_chunk_size}")
+        sys.exit(1)
+        
     # Create log file with timestamp if requested
     log_file = None
     if args.log_file:
@@ -1122,7 +1591,8 @@ def main():
         log_file = f"{args.log_file}_{timestamp}.log"
         
     # Create updater
-    updater = DS620Updater(firmware_path, cwd_dir, log_file)
+    updater = DS620Updater(firmware_path, cwd_dir, log_file, chunk_size=args.out_chunk_size,
+                           skip_current_cwd=args.skip_current_cwd)
     
     # Check if running as root for actual updates
     if not args.dry_run and os.geteuid() != 0:
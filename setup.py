@@ -45,6 +45,10 @@ setup(
             "flake8",
             "mypy",
         ],
+        "cups": [
+            "pycups>=2.0.1",
+            "dbus-python>=1.2.0",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -2,34 +2,74 @@
 Test protocol command formatting
 """
 
+import array
+
 import pytest
-from ds620_updater.updater import DS620Updater
+import usb.core
+from ds620_updater.updater import DS620Updater, pack_command
+
+
+class FakeIn:
+    """Bulk IN endpoint that hands out queued reads, then times out; a
+    queued None times out once"""
+    bEndpointAddress = 0x82
+
+    def __init__(self):
+        self.reads = []
+
+    def read(self, buffer, timeout=None):
+        if not self.reads:
+            raise usb.core.USBTimeoutError("Operation timed out")
+        data = self.reads.pop(0)
+        if data is None:
+            raise usb.core.USBTimeoutError("Operation timed out")
+        if isinstance(buffer, int):
+            return array.array('B', data[:buffer])
+        buffer[:len(data)] = array.array('B', data)
+        return len(data)
+
+    def clear_halt(self):
+        pass
+
+
+class FakeOut:
+    """Bulk OUT endpoint that records writes; each command written queues
+    the next scripted reply on the IN endpoint (None: no reply in time)"""
+    bEndpointAddress = 0x01
+    wMaxPacketSize = 512
+
+    def __init__(self, ep_in, replies=()):
+        self.ep_in = ep_in
+        self.replies = list(replies)
+        self.written = []
+
+    def write(self, data, timeout=None):
+        data = bytes(data)
+        self.written.append(data)
+        if data[:1] == b"\x1b" and data.endswith(b"\r\n") and self.replies:
+            self.ep_in.reads.append(self.replies.pop(0))
+        return len(data)
+
+
+def attach_fake_printer(updater, replies=()):
+    """Give an updater fake endpoints answering commands with replies"""
+    updater.ep_in = FakeIn()
+    updater.ep_out = FakeOut(updater.ep_in, replies)
+    return updater.ep_out
 
 
 class TestProtocol:
     """Test protocol command formatting"""
     
     def test_command_padding(self):
-        """Test that commands are padded to 24 bytes"""
-        # Create a mock updater
-        updater = DS620Updater(None, None)
-        
-        # Test command formatting
-        test_commands = [
-            ("PSTATUS", 24),
-            ("PINFO  FVER", 24),
-            ("PTBL_RDVersion", 24),
-            ("PFW_UPDFLASH_REWRITE", 24),
-        ]
-        
-        for cmd, expected_len in test_commands:
-            # Simulate command formatting (without USB)
-            esc = 0x1B
-            cmd_bytes = bytes([esc]) + cmd.encode('ascii')
-            if len(cmd_bytes) < 24:
-                cmd_bytes += b' ' * (24 - len(cmd_bytes))
-            
-            assert len(cmd_bytes) == expected_len, f"Command {cmd} not padded correctly"
+        """Test that commands are framed as ESC + text padded to 24 bytes"""
+        for cmd in ("PSTATUS", "PINFO  FVER", "PTBL_RDVersion", "PFW_UPDFLASH_REWRITE"):
+            frame = pack_command(cmd)
+            assert len(frame) == 24, f"Command {cmd} not padded correctly"
+            assert frame == b"\x1b" + cmd.encode('ascii') + b" " * (23 - len(cmd))
+
+        # str and pre-encoded bytes commands give the same frame
+        assert pack_command(b"PSTATUS") == pack_command("PSTATUS")
     
     def test_usb_device_ids(self):
         """Test USB device ID constants"""
@@ -40,4 +80,118 @@ class TestProtocol:
         assert 0x0001 in PRODUCT_IDS[0x1343]
         assert 0x8b01 in PRODUCT_IDS[0x1452]
         assert len(PRODUCT_IDS[0x1343]) == 11
-        assert len(PRODUCT_IDS[0x1452]) == 6
\ No newline at end of file
+        assert len(PRODUCT_IDS[0x1452]) == 6
+
+    def test_send_command_framing(self):
+        """Test that send_command frames commands as ESC + 23 bytes + CRLF"""
+        updater = DS620Updater(None, None)
+        ep_out = attach_fake_printer(updater)
+
+        updater.send_command("PSTATUS")
+        updater.send_command("PINFO  FVER", b"1234")
+
+        assert ep_out.written[0] == b"\x1bPSTATUS" + b" " * 16 + b"\r\n"
+        assert ep_out.written[1] == b"\x1bPINFO  FVER" + b" " * 12 + b"1234\r\n"
+
+    def test_query_commands_splits_batched_responses(self):
+        """Test that responses packed into one USB read are returned in order"""
+        updater = DS620Updater(None, None)
+        ep_out = attach_fake_printer(updater, [b"00000004V1.0" + b"00000003ABC"])
+
+        responses = updater.query_commands(["PTBL_RDVersion", "PINFO  SERIAL_NUMBER"])
+
+        assert len(ep_out.written) == 2
+        assert responses == [b"V1.0", b"ABC"]
+
+    def test_trailing_bytes_are_not_a_reply(self):
+        """Test that bytes after a reply can't stand in for the next one"""
+        updater = DS620Updater(None, None)
+        attach_fake_printer(updater, [b"00000002OK\r\n"])
+
+        assert updater.query_commands(["PSTATUS"]) == [b"OK"]
+        assert updater.rx_pending == b''
+
+        # The printer never acks the mode switch
+        assert not updater.enter_update_mode()
+
+    def test_query_commands_missing_reply(self):
+        """Test that a reply missing its timeout doesn't shift later replies
+        onto the wrong commands"""
+        updater = DS620Updater(None, None)
+        # The second reply doesn't arrive in time; the third follows it late
+        ep_out = attach_fake_printer(updater, [b"00000002V1", None, b"00000002V3"])
+
+        responses = updater.query_commands(["PINFO  MEDIA", "PINFO  PQTY", "PINFO  MQTY"])
+
+        assert responses == [b"V1", None, None]
+        assert ep_out.ep_in.reads == []
+
+    def test_send_firmware_stream(self, tmp_path, monkeypatch):
+        """Test that firmware goes out as command, 8-digit length, then data"""
+        import ds620_updater.updater as updater_module
+
+        monkeypatch.setattr(updater_module.time, "sleep", lambda seconds: None)
+
+        firmware = bytes(range(256)) * 1000
+        firmware_path = tmp_path / "DS620_test.s"
+        firmware_path.write_bytes(firmware)
+
+        updater = DS620Updater(firmware_path, tmp_path)
+        ep_out = attach_fake_printer(updater, [b"00000002OK"])
+
+        assert updater.send_firmware()
+
+        stream = b"".join(ep_out.written)
+        command = b"\x1bPTBL_WTCTRLD_UPDATE".ljust(24) + b"\r\n"
+        assert stream == command + b"%08d" % len(firmware) + firmware
+
+    def test_send_firmware_whole_packet_chunks(self, tmp_path):
+        """Test that only the last firmware write may end in a short packet"""
+        firmware = bytes(range(256)) * 20
+        firmware_path = tmp_path / "DS620_test.s"
+        firmware_path.write_bytes(firmware)
+
+        updater = DS620Updater(firmware_path, tmp_path, chunk_size=1000)
+        ep_out = attach_fake_printer(updater, [b"00000002OK"])
+
+        assert updater.send_firmware()
+
+        payload_writes = ep_out.written[1:]
+        assert all(len(data) == 512 for data in payload_writes[:-1])
+        assert b"".join(payload_writes) == b"%08d" % len(firmware) + firmware
+
+    def test_cwd_is_current(self, tmp_path):
+        """Test matching a printer's CWD version response to a CWD file"""
+        updater = DS620Updater(None, tmp_path)
+        cwd_path = tmp_path / "DS620_PD_300_0111.cwd"
+        cwd_path.write_bytes(b"DNP    " + bytes(9))
+
+        assert updater.cwd_is_current(cwd_path, b"0111")
+        assert updater.cwd_is_current(cwd_path, b"Ver 01.11\r\n")
+        assert not updater.cwd_is_current(cwd_path, b"0110")
+        assert not updater.cwd_is_current(cwd_path, b"20110111")
+        assert not updater.cwd_is_current(cwd_path, None)
+
+        # Not a CWD file, whatever its name says
+        cwd_path.write_bytes(bytes(16))
+        assert not updater.cwd_is_current(cwd_path, b"0111")
+
+    def test_console_handler_added_once(self):
+        """Test that creating several updaters doesn't duplicate console output"""
+        from ds620_updater.updater import CONSOLE_HANDLER_NAME
+
+        first = DS620Updater(None, None)
+        DS620Updater(None, None)
+
+        names = [h.get_name() for h in first.logger.handlers]
+        assert names.count(CONSOLE_HANDLER_NAME) == 1
+
+    def test_read_cwd_payload_rejects_short_file(self, tmp_path):
+        """Test that a CWD file shorter than its expected size is not framed"""
+        cwd_path = tmp_path / "DS620_PD_300_0111.cwd"
+        cwd_path.write_bytes(b"DNP    " + bytes(9))
+        updater = DS620Updater(None, tmp_path)
+
+        assert updater.read_cwd_payload(cwd_path, 16) == b"00000016DNP    " + bytes(9)
+        with pytest.raises(OSError):
+            updater.read_cwd_payload(cwd_path, 32)